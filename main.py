@@ -1,124 +1,235 @@
-from dotenv import load_dotenv
-from agent_framework.devui import serve
-from src.agents.jaguar_query_agent import create_jaguar_query_agent
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from scripts.ttl_to_nt import ttl_to_nt
 from maplib import Model
 import polars as pl
 
-# Load environment variables
-load_dotenv()
 
+def _is_stale(source_path, cache_path):
+    """True if the cache file is missing or older than its source file."""
+    return not os.path.exists(cache_path) or os.path.getmtime(cache_path) < os.path.getmtime(source_path)
 
-def initialize_jaguar_df():
+
+def _replace_atomically(path, write):
+    """Call write(tmp_path) on a temporary file next to path, then rename it into place,
+    so an interrupted run or a concurrent reader never sees a half-written cache file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_text(path):
+    """Read a UTF-8 text file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _ensure_ntriples(ttl_path="data/jaguar_ontology.ttl", nt_path="data/jaguar_ontology.nt"):
+    """Return the pre-built N-Triples ontology (see scripts/ttl_to_nt.py).
+    It is regenerated here if the Turtle file was edited without re-running the script."""
+    if _is_stale(ttl_path, nt_path):
+        ttl_to_nt(ttl_path, nt_path)
+        print(f"📦 Cached {ttl_path} as {nt_path}")
+    return nt_path
+
+
+def _ensure_parquet(csv_path, parquet_path):
+    """Convert the CSV to Parquet once, and again whenever the CSV is newer."""
+    if _is_stale(csv_path, parquet_path):
+        # Stream the CSV straight into Parquet so the whole file is never held (or rechunked) in memory
+        lf = pl.scan_csv(csv_path, low_memory=False)
+        _replace_atomically(parquet_path, lambda path: lf.sink_parquet(path, compression="zstd", statistics=True))
+        print(f"📦 Cached {csv_path} as {parquet_path}")
+    return parquet_path
+
+
+# Create IRI columns from string values. Read more about this in csv2graph.ipynb: 
+# concat_str builds each IRI in a single pass (null stays null, like `+`)
+RES_PREFIX = "http://example.org/resource#"
+
+
+# ASCII characters outside the RFC 3986 unreserved set (spaces, commas, `%` itself, ...)
+# and their percent-encodings. Non-ASCII characters are allowed in IRIs and kept as they are.
+IRI_UNSAFE_CHARS = [chr(c) for c in range(128) if not (chr(c).isalnum() or chr(c) in "-_.~")]
+IRI_ESCAPES = [f"%{ord(c):02X}" for c in IRI_UNSAFE_CHARS]
+
+
+def _iri(expr):
+    """Prefix a string expression with RES_PREFIX to make it an IRI.
+    Unsafe characters are percent-encoded in one vectorized pass, so distinct values
+    always give distinct IRIs (e.g. "Cerrado, Brazil" -> Cerrado%2C%20Brazil)."""
+    return pl.concat_str([pl.lit(RES_PREFIX), expr.str.replace_many(IRI_UNSAFE_CHARS, IRI_ESCAPES)])
+
+
+# Template for the scalar columns (one row per jaguar) and the projection that feeds it
+RECORD_TEMPLATE = "http://example.org/ontology#JaguarRecord"
+RECORD_COLUMNS = (
+    _iri(pl.col("jaguar_id")).alias("id"),
+    pl.col("name"),
+    pl.col("gender"),
+    pl.col("first_sighted"),
+    pl.col("is_killed"),
+    pl.col("cause_of_death"),
+    pl.col("identification_mark"),
+    pl.col("status_notes"),
+)
+
+# A `;`-separated token without surrounding whitespace (empty tokens never match)
+LIST_TOKEN_PATTERN = r"[^;\s][^;]*[^;\s]|[^;\s]"
+
+# List column -> (IRI column, template mapping one exploded value)
+LIST_COLUMN_TEMPLATES = {
+    "location": ("location_iri", "http://example.org/ontology#JaguarLocation"),
+    "monitoring_org": ("monitoring_org_iri", "http://example.org/ontology#JaguarMonitoringOrg"),
+    "threats": ("threat_iri", "http://example.org/ontology#JaguarThreat"),
+    "monitoring_technique": ("technique_iri", "http://example.org/ontology#JaguarTechnique"),
+}
+
+# The jaguar data, and the directory holding the per-template data frames built from it
+# as Arrow IPC files
+JAGUARS_CSV = "data/jaguars.csv"
+FRAME_CACHE_DIR = "data/jaguars_exploded"
+
+
+def _frame_cache_path(template_iri, cache_dir):
+    """Arrow IPC file caching the data frame for one template, e.g. .../JaguarThreat.arrow"""
+    return os.path.join(cache_dir, template_iri.rsplit("#", 1)[-1] + ".arrow")
+
+
+def initialize_jaguar_dfs(csv_path=JAGUARS_CSV, cache_dir=FRAME_CACHE_DIR):
+    """
+    Return one DataFrame per OTTR template, keyed by template IRI.
+
+    The frames are cached as uncompressed Arrow IPC files, which Polars memory-maps on
+    read, so warm starts skip the whole Polars pipeline. They are rebuilt whenever the
+    CSV or this file (the pipeline itself) is newer than the cache.
+    """
+    template_iris = [RECORD_TEMPLATE] + [template_iri for _, template_iri in LIST_COLUMN_TEMPLATES.values()]
+    cache_paths = {template_iri: _frame_cache_path(template_iri, cache_dir) for template_iri in template_iris}
+
+    if any(_is_stale(source, path) for source in (csv_path, __file__) for path in cache_paths.values()):
+        jaguar_dfs = _build_jaguar_dfs(csv_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        for template_iri, jaguar_df in jaguar_dfs.items():
+            _replace_atomically(cache_paths[template_iri], jaguar_df.write_ipc)
+    else:
+        jaguar_dfs = {template_iri: pl.read_ipc(path) for template_iri, path in cache_paths.items()}
+        print("📦 Reusing cached jaguar data frames")
+
+    # Same number a SPARQL COUNT of ont:Jaguar would give, without scanning the graph
+    print(f"📊 Loaded {jaguar_dfs[RECORD_TEMPLATE]['id'].n_unique()} jaguar records")
+    print("🎉 Jaguar data frames ready for mapping!\n")
+    return jaguar_dfs
+
+
+def _build_jaguar_dfs(csv_path):
+    """
+    Build one DataFrame per OTTR template, keyed by template IRI.
+
+    The scalar columns are mapped once per jaguar with JaguarRecord. Each list column is
+    exploded on its own into an (id, IRI, label) frame for its sub-template, so the row
+    count is the sum of the list lengths rather than their Cartesian product.
+    """
     
-    # Load CSV as Polars DataFrame
-    df = pl.read_csv("data/jaguars.csv")
+    # Scan the Parquet copy of the CSV lazily so Polars only reads the columns the template needs
+    lf = pl.scan_parquet(_ensure_parquet(csv_path, os.path.splitext(csv_path)[0] + ".parquet"))
+
+    print(f"\nColumns: {', '.join(lf.collect_schema().names())}")
 
-    print(f"📊 Loaded {len(df)} jaguar records")
-    print(f"\nColumns: {', '.join(df.columns)}")
+    # Each plan below ends in its own select, so Polars only reads (and explodes) the
+    # columns that template needs
+    jaguar_lfs = {RECORD_TEMPLATE: lf.select(RECORD_COLUMNS)}
 
     # === HANDLING LIST COLUMNS ===
-    # We split and explode all list columns to create a flat table.
-    # This generates a Cartesian product of rows, but RDF deduplication handles the redundancy.
-
-    # Define list columns to process
-    list_columns = ["location", "monitoring_org", "threats", "monitoring_technique"]
-    # Start with the base DataFrame
-    df_exploded = df
-
-    # Split and explode all list columns
-    for col_name in list_columns:
-        df_exploded = df_exploded.with_columns(
-            pl.col(col_name).str.split(";")
-        ).explode(col_name)
-
-    # === HANDLING IRI COLUMNS ===
-    # Create IRI columns from string values. Read more about this in csv2graph.ipynb: 
-    RES_PREFIX = "http://example.org/resource#"
-    df_exploded = df_exploded.with_columns([
-        (pl.lit(RES_PREFIX) + pl.col("jaguar_id")).alias("id"),
-        (pl.lit(RES_PREFIX) + pl.col("location").str.strip_chars()).alias("location_iri"),
-        (pl.lit(RES_PREFIX) + pl.col("monitoring_org").str.strip_chars()).alias("monitoring_org_iri"),
-        (pl.lit(RES_PREFIX) + pl.col("threats").str.strip_chars()).alias("threat_iri"),
-        (pl.lit(RES_PREFIX) + pl.col("monitoring_technique").str.strip_chars()).alias("technique_iri")
-    ])
-
-    # Select columns for the template
-    # We include BOTH the IRI and the original string for each resource type
-    df_final = df_exploded.select([
-        "id",
-        "name", 
-        "gender",
-        "location",              # String label
-        "location_iri",          # IRI
-        "monitoring_org",        # String label
-        "monitoring_org_iri",    # IRI
-        "first_sighted",
-        "is_killed",
-        "cause_of_death",
-        "identification_mark",
-        "threats",               # String label
-        "threat_iri",            # IRI
-        "monitoring_technique",  # String label
-        "technique_iri",         # IRI
-        "status_notes"
-    ])
-    
-    print("🎉 Jaguar data frame ready for mapping!\n")
-    return df_final
+    # Each list column is split into trimmed tokens in one regex pass and exploded on its own.
+    # Rows are deduplicated here (e.g. a location listed twice for one jaguar) instead of
+    # letting the RDF layer dedupe them triple by triple.
+    for col_name, (iri_col, template_iri) in LIST_COLUMN_TEMPLATES.items():
+        lf_list = lf.filter(pl.col(col_name).is_not_null()).select([
+            _iri(pl.col("jaguar_id")).alias("id"),
+            pl.col(col_name).str.extract_all(LIST_TOKEN_PATTERN)
+        ]).explode(col_name).drop_nulls(col_name)
 
+        # Dictionary-encode the jaguar IRI and the label: only a handful of distinct values
+        # repeat across rows, so the dedup hashes small integer codes. Maplib only accepts
+        # String columns for IRIs and xsd:string, so decode again before mapping.
+        jaguar_lfs[template_iri] = lf_list.with_columns(
+            pl.col("id", col_name).cast(pl.Categorical)
+        ).unique(maintain_order=False).select([
+            pl.col("id").cast(pl.String),
+            _iri(pl.col(col_name).cast(pl.String)).alias(iri_col),
+            pl.col(col_name).cast(pl.String)
+        ])
 
-def main():
+    # The plans are independent (no join needed, each feeds its own template), so collect
+    # them together and let Polars run them in parallel over one shared scan
+    return dict(zip(jaguar_lfs, pl.collect_all(jaguar_lfs.values(), engine="streaming")))
+
+
+def build_jaguar_model(csv_path=JAGUARS_CSV, cache_dir=FRAME_CACHE_DIR):
     """
     Initialize Maplib model with CSV workflow (production approach).
     
     This follows the "load pre-written template" approach from csv2graph.ipynb:
    
-    1. Load OTTR template from file
-    2. Load CSV data
-    3. Map CSV to RDF using template
-    4. Load ontology
-    
-    Optionally load additional manually-curated data
+    1. Load OTTR template from file, CSV data and ontology (concurrently)
+    2. Map CSV to RDF using template
     
-    Start the dev UI with jaguar query agent"""
-      
-    
-    
-    #Load OTTR template from file (production approach)
-    with open("data/jaguar_template.ottr", 'r', encoding='utf-8') as f:
-        jaguar_ottr_template = f.read()
-    print("🦦 Jaguar OTTR template loaded...")
-    
-    #Load OTTR template from file (production approach)
-    jaguar_df = initialize_jaguar_df()
-        
-    print("🕸 Initializing Jaguar Knowledge Graph...")
+    Optionally load additional manually-curated data"""
     
     # Initialize the knowledge graph model (production pipeline)  
     model = Model()
+
+    # The template read, the data frame build and the ontology load are independent,
+    # so run them side by side instead of waiting on each file in turn
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        #Load OTTR template from file (production approach)
+        template_future = pool.submit(_read_text, "data/jaguar_template.ottr")
+        #Build one data frame per template from the CSV
+        dfs_future = pool.submit(initialize_jaguar_dfs, csv_path, cache_dir)
+        #Load ontology (only this thread touches the model until the pool is done)
+        ontology_future = pool.submit(lambda: model.read(_ensure_ntriples(), format="ntriples"))
+
+        jaguar_ottr_template = template_future.result()
+        print("🦦 Jaguar OTTR template loaded...")
+        jaguar_dfs = dfs_future.result()
+        ontology_future.result()
+
+    print("🕸 Initializing Jaguar Knowledge Graph...")
+    
     model.add_template(jaguar_ottr_template)
-    model.map("http://example.org/ontology#JaguarInstance", jaguar_df)
-    model.read("data/jaguar_ontology.ttl", format="turtle")
+    for template_iri, jaguar_df in jaguar_dfs.items():
+        model.map(template_iri, jaguar_df)
     
     print("🚀 Success! The data frame is now a Knowledge Graph...")
 
     #Load additional manually-curated instance data (optional)
     #model.read("data/jaguars.ttl", format="turtle")
-    
-    #Quick Debug: Count total jaguars in knowledge graph (optional)
-    #query = """
-    #PREFIX ont: <http://example.org/ontology#>
-    #SELECT (COUNT(?jaguar) as ?count) WHERE {
-    #    ?jaguar a ont:Jaguar .
-    #}
-    #result = model.query(query)
-    #print(f"\n📊 Total jaguars in jaguar_model: {count}")
+
+    return model
+
+
+def main():
+    """
+    Build the jaguar knowledge graph and start the dev UI with jaguar query agent"""
+    # Imported here so the graph pipeline above can be used (and tested) without the
+    # agent framework installed
+    from agent_framework.devui import serve
+    from src.agents.jaguar_query_agent import create_jaguar_query_agent
+
+    model = build_jaguar_model()
 
     # Create query agent with the initialized model
     query_agent = create_jaguar_query_agent(model)
     
     # Create DevUI instance Running on localhost:8080
-    serve(entities=[query_agent], auto_open=True)
+    # Only open a browser for interactive starts (not under a supervisor or in CI)
+    serve(entities=[query_agent], auto_open=sys.stdout.isatty())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
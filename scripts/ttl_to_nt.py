@@ -0,0 +1,54 @@
+"""
+Convert the jaguar ontology from Turtle to N-Triples.
+
+N-Triples is line based with no prefixes or relative IRIs to resolve, so
+Maplib parses it much faster than Turtle. main.py reads the generated
+data/jaguar_ontology.nt at startup; run this script after editing
+data/jaguar_ontology.ttl:
+
+    python scripts/ttl_to_nt.py
+"""
+
+import argparse
+import os
+
+try:
+    from maplib import Model
+except ImportError:
+    raise ImportError("maplib is required. Install with: pip install maplib")
+
+
+def ttl_to_nt(ttl_path, nt_path):
+    """Parse a Turtle file with Maplib and write it back out as N-Triples."""
+    model = Model()
+    model.read(ttl_path, format="turtle")
+
+    # Write to a temporary file and rename it into place, so main.py never reads a
+    # half-written ontology
+    tmp_path = f"{nt_path}.{os.getpid()}.tmp"
+    try:
+        model.write(tmp_path, format="ntriples")
+
+        # Maplib writes triples in hash order; sort them so regenerating gives a stable diff
+        with open(tmp_path, encoding="utf-8") as f:
+            lines = sorted(set(f))
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, nt_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("ttl_path", nargs="?", default="data/jaguar_ontology.ttl")
+    parser.add_argument("nt_path", nargs="?", default="data/jaguar_ontology.nt")
+    args = parser.parse_args()
+
+    ttl_to_nt(args.ttl_path, args.nt_path)
+    print(f"📦 Wrote {args.nt_path} from {args.ttl_path}")
+
+
+if __name__ == "__main__":
+    main()
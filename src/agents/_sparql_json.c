@@ -0,0 +1,295 @@
+/*
+ * Optional C accelerator for jaguar_tool.py: encodes a query result straight to
+ * SPARQL JSON bytes, without building a dict per cell. jaguar_tool.py falls back to
+ * its pure Python encoders when this module is not built.
+ *
+ * Build in place (from the repository root):
+ *   cc -O2 -shared -fPIC $(python3-config --includes) src/agents/_sparql_json.c \
+ *      -o src/agents/_sparql_json$(python3-config --extension-suffix)
+ *
+ * encode(vars, columns, kinds) -> bytes
+ *   vars:    result variable names (str)
+ *   columns: one list of Python values per variable, all of the same length
+ *   kinds:   one column kind per variable, matching the Python encoders:
+ *            0 = string (uri if it starts with http:// or https://, else literal)
+ *            1 = boolean, 2 = integer, 3 = plain literal (str(value)),
+ *            4 = any (picked per value by exact type, like _encode_any),
+ *            5 = uri, 6 = literal (string columns already known to hold only one of them)
+ * None cells are left out of their row's binding, as in the Python path.
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <string.h>
+
+enum { KIND_STRING, KIND_BOOLEAN, KIND_INTEGER, KIND_PLAIN, KIND_ANY, KIND_URI, KIND_LITERAL };
+
+#define XSD_BOOLEAN "http://www.w3.org/2001/XMLSchema#boolean"
+#define XSD_INTEGER "http://www.w3.org/2001/XMLSchema#integer"
+
+typedef struct {
+    char *data;
+    Py_ssize_t len;
+    Py_ssize_t cap;
+} buffer;
+
+static int
+buf_reserve(buffer *b, Py_ssize_t extra)
+{
+    if (b->len + extra <= b->cap)
+        return 0;
+    Py_ssize_t cap = b->cap ? b->cap : 4096;
+    while (cap < b->len + extra)
+        cap *= 2;
+    char *data = PyMem_Realloc(b->data, cap);
+    if (data == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    b->data = data;
+    b->cap = cap;
+    return 0;
+}
+
+static int
+buf_write(buffer *b, const char *s, Py_ssize_t n)
+{
+    if (buf_reserve(b, n) < 0)
+        return -1;
+    memcpy(b->data + b->len, s, n);
+    b->len += n;
+    return 0;
+}
+
+#define BUF_LITERAL(b, s) buf_write((b), (s), sizeof(s) - 1)
+
+/* Write UTF-8 text as a JSON string, escaped the same way as orjson / json.dumps */
+static int
+buf_json_string(buffer *b, const char *s, Py_ssize_t n)
+{
+    static const char hex[] = "0123456789abcdef";
+    /* Worst case every byte becomes \u00XX */
+    if (buf_reserve(b, n * 6 + 2) < 0)
+        return -1;
+    char *out = b->data + b->len;
+    *out++ = '"';
+    for (Py_ssize_t i = 0; i < n; i++) {
+        unsigned char c = (unsigned char)s[i];
+        if (c >= 0x20 && c != '"' && c != '\\') {
+            *out++ = (char)c;
+            continue;
+        }
+        *out++ = '\\';
+        switch (c) {
+        case '"': *out++ = '"'; break;
+        case '\\': *out++ = '\\'; break;
+        case '\n': *out++ = 'n'; break;
+        case '\r': *out++ = 'r'; break;
+        case '\t': *out++ = 't'; break;
+        case '\b': *out++ = 'b'; break;
+        case '\f': *out++ = 'f'; break;
+        default:
+            *out++ = 'u';
+            *out++ = '0';
+            *out++ = '0';
+            *out++ = hex[c >> 4];
+            *out++ = hex[c & 0xf];
+        }
+    }
+    *out++ = '"';
+    b->len = out - b->data;
+    return 0;
+}
+
+static int
+buf_json_str_object(buffer *b, PyObject *text)
+{
+    Py_ssize_t n;
+    const char *s = PyUnicode_AsUTF8AndSize(text, &n);
+    if (s == NULL)
+        return -1;
+    return buf_json_string(b, s, n);
+}
+
+/* {"type":"literal","value":<str(value)>[,"datatype":...]} */
+static int
+buf_literal(buffer *b, PyObject *value, const char *datatype)
+{
+    PyObject *text = PyObject_Str(value);
+    if (text == NULL)
+        return -1;
+    int rc = BUF_LITERAL(b, "{\"type\":\"literal\",\"value\":");
+    if (rc == 0)
+        rc = buf_json_str_object(b, text);
+    Py_DECREF(text);
+    if (rc < 0)
+        return -1;
+    if (datatype != NULL) {
+        if (BUF_LITERAL(b, ",\"datatype\":\"") < 0 || buf_write(b, datatype, strlen(datatype)) < 0)
+            return -1;
+        if (BUF_LITERAL(b, "\"") < 0)
+            return -1;
+    }
+    return BUF_LITERAL(b, "}");
+}
+
+/* is_uri: 1 or 0 if known for the column, -1 to check this cell's prefix */
+static int
+buf_string_cell(buffer *b, PyObject *value, int is_uri)
+{
+    Py_ssize_t n;
+    const char *s = PyUnicode_AsUTF8AndSize(value, &n);
+    if (s == NULL)
+        return -1;
+    if (is_uri < 0)
+        is_uri = (n >= 7 && memcmp(s, "http://", 7) == 0) || (n >= 8 && memcmp(s, "https://", 8) == 0);
+    int rc = is_uri ? BUF_LITERAL(b, "{\"type\":\"uri\",\"value\":") : BUF_LITERAL(b, "{\"type\":\"literal\",\"value\":");
+    if (rc < 0)
+        return -1;
+    if (buf_json_string(b, s, n) < 0)
+        return -1;
+    return BUF_LITERAL(b, "}");
+}
+
+static int
+buf_boolean_cell(buffer *b, PyObject *value)
+{
+    if (value == Py_True)
+        return BUF_LITERAL(b, "{\"type\":\"literal\",\"value\":\"true\",\"datatype\":\"" XSD_BOOLEAN "\"}");
+    if (value == Py_False)
+        return BUF_LITERAL(b, "{\"type\":\"literal\",\"value\":\"false\",\"datatype\":\"" XSD_BOOLEAN "\"}");
+    PyErr_SetString(PyExc_TypeError, "boolean column holds a non-bool value");
+    return -1;
+}
+
+static int
+buf_cell(buffer *b, PyObject *value, long kind)
+{
+    switch (kind) {
+    case KIND_STRING:
+    case KIND_URI:
+    case KIND_LITERAL:
+        if (!PyUnicode_CheckExact(value)) {
+            PyErr_SetString(PyExc_TypeError, "string column holds a non-str value");
+            return -1;
+        }
+        return buf_string_cell(b, value, kind == KIND_STRING ? -1 : kind == KIND_URI);
+    case KIND_BOOLEAN:
+        return buf_boolean_cell(b, value);
+    case KIND_INTEGER:
+        return buf_literal(b, value, XSD_INTEGER);
+    case KIND_PLAIN:
+        return buf_literal(b, value, NULL);
+    default:
+        /* Exact type checks, so bool never matches int */
+        if (PyLong_CheckExact(value))
+            return buf_literal(b, value, XSD_INTEGER);
+        if (PyUnicode_CheckExact(value))
+            return buf_string_cell(b, value, -1);
+        if (PyBool_Check(value))
+            return buf_boolean_cell(b, value);
+        return buf_literal(b, value, NULL);
+    }
+}
+
+static PyObject *
+encode(PyObject *Py_UNUSED(module), PyObject *args)
+{
+    PyObject *vars, *columns, *kinds_list;
+    if (!PyArg_ParseTuple(args, "O!O!O!:encode", &PyList_Type, &vars, &PyList_Type, &columns,
+                          &PyList_Type, &kinds_list))
+        return NULL;
+
+    Py_ssize_t n_vars = PyList_GET_SIZE(vars);
+    if (PyList_GET_SIZE(columns) != n_vars || PyList_GET_SIZE(kinds_list) != n_vars) {
+        PyErr_SetString(PyExc_ValueError, "vars, columns and kinds must have the same length");
+        return NULL;
+    }
+
+    Py_ssize_t n_rows = 0;
+    long *kinds = PyMem_Calloc(n_vars ? n_vars : 1, sizeof(long));
+    if (kinds == NULL)
+        return PyErr_NoMemory();
+    for (Py_ssize_t j = 0; j < n_vars; j++) {
+        PyObject *column = PyList_GET_ITEM(columns, j);
+        if (!PyUnicode_Check(PyList_GET_ITEM(vars, j)) || !PyList_Check(column)) {
+            PyErr_SetString(PyExc_TypeError, "vars must be str and columns must be lists");
+            PyMem_Free(kinds);
+            return NULL;
+        }
+        if (j == 0)
+            n_rows = PyList_GET_SIZE(column);
+        else if (PyList_GET_SIZE(column) != n_rows) {
+            PyErr_SetString(PyExc_ValueError, "all columns must have the same length");
+            PyMem_Free(kinds);
+            return NULL;
+        }
+        kinds[j] = PyLong_AsLong(PyList_GET_ITEM(kinds_list, j));
+        if (kinds[j] == -1 && PyErr_Occurred()) {
+            PyMem_Free(kinds);
+            return NULL;
+        }
+    }
+
+    buffer b = {NULL, 0, 0};
+    if (BUF_LITERAL(&b, "{\"head\":{\"vars\":[") < 0)
+        goto error;
+    for (Py_ssize_t j = 0; j < n_vars; j++) {
+        if (j > 0 && BUF_LITERAL(&b, ",") < 0)
+            goto error;
+        if (buf_json_str_object(&b, PyList_GET_ITEM(vars, j)) < 0)
+            goto error;
+    }
+    if (BUF_LITERAL(&b, "]},\"results\":{\"bindings\":[") < 0)
+        goto error;
+
+    for (Py_ssize_t i = 0; i < n_rows; i++) {
+        if (i > 0 && BUF_LITERAL(&b, ",") < 0)
+            goto error;
+        if (BUF_LITERAL(&b, "{") < 0)
+            goto error;
+        int first = 1;
+        for (Py_ssize_t j = 0; j < n_vars; j++) {
+            PyObject *value = PyList_GET_ITEM(PyList_GET_ITEM(columns, j), i);
+            if (value == Py_None)
+                continue;
+            if (!first && BUF_LITERAL(&b, ",") < 0)
+                goto error;
+            first = 0;
+            if (buf_json_str_object(&b, PyList_GET_ITEM(vars, j)) < 0 || BUF_LITERAL(&b, ":") < 0)
+                goto error;
+            if (buf_cell(&b, value, kinds[j]) < 0)
+                goto error;
+        }
+        if (BUF_LITERAL(&b, "}") < 0)
+            goto error;
+    }
+    if (BUF_LITERAL(&b, "]}}") < 0)
+        goto error;
+
+    PyObject *result = PyBytes_FromStringAndSize(b.data, b.len);
+    PyMem_Free(b.data);
+    PyMem_Free(kinds);
+    return result;
+
+error:
+    PyMem_Free(b.data);
+    PyMem_Free(kinds);
+    return NULL;
+}
+
+static PyMethodDef sparql_json_methods[] = {
+    {"encode", encode, METH_VARARGS,
+     "encode(vars, columns, kinds) -> bytes\n\nEncode result columns as SPARQL JSON."},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef sparql_json_module = {
+    PyModuleDef_HEAD_INIT, "_sparql_json", "SPARQL JSON encoder for jaguar_tool.py.", -1,
+    sparql_json_methods, NULL, NULL, NULL, NULL,
+};
+
+PyMODINIT_FUNC
+PyInit__sparql_json(void)
+{
+    return PyModule_Create(&sparql_json_module);
+}
@@ -1,13 +1,24 @@
 
 import os
+import functools
 from dotenv import load_dotenv
 from agent_framework.openai import OpenAIResponsesClient, OpenAISettings
 from agent_framework import ChatAgent
 from src.agents.jaguar_tool import create_query_jaguar_model_tool
 
 
-# Load environment variables
-load_dotenv()
+@functools.cache
+def _client():
+    """Create the OpenAI client once per process, so rebuilt agents reuse it."""
+    # Load environment variables (the only place .env is read, once per process)
+    load_dotenv()
+
+    # OpenAI settings with larger context window model
+    settings = OpenAISettings(
+        api_key=os.getenv("OPENAI_API_KEY", ""),
+        model_id=os.getenv("OPENAI_RESPONSES_MODEL_ID", "gpt-4o")  # Use GPT-4o for larger context window
+    )
+    return OpenAIResponsesClient(settings=settings)
 
 
 def create_jaguar_query_agent(jaguar_model):
@@ -42,14 +53,8 @@ def create_jaguar_query_agent(jaguar_model):
     - Be concise but comprehensive in your answers
     - Always mention that the information comes from the jaguar database"""
     
-        # OpenAI settings with larger context window model
-    settings = OpenAISettings(
-        api_key=os.getenv("OPENAI_API_KEY", ""),
-        model_id=os.getenv("OPENAI_RESPONSES_MODEL_ID", "gpt-4o")  # Use GPT-4o for larger context window
-    )
-    
-    # Create client
-    client = OpenAIResponsesClient(settings=settings)
+    # Create client (shared by every agent built in this process)
+    client = _client()
     
     # Create query tool bound to this model
     jaguar_query_tool = create_query_jaguar_model_tool(jaguar_model)
@@ -15,413 +15,808 @@ For graph construction workflow, see csv2graph.ipynb and main.py.
 """
 
 import os
+import re
 import json
-from dotenv import load_dotenv
+import string
+import textwrap
+import functools
+from json.encoder import encode_basestring as _json_string
+import polars as pl
 
 try:
     from maplib import Model
 except ImportError:
     raise ImportError("maplib is required. Install with: pip install maplib")
 
-# Load environment variables
-load_dotenv()
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        """Serialize query results to compact UTF-8 JSON (orjson, C implementation)."""
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        """Serialize query results to compact UTF-8 JSON (stdlib fallback, no pretty-printing)."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+try:
+    # Optional C encoder for the bindings loop (see _sparql_json.c for how to build it)
+    from ._sparql_json import encode as _encode_result
+except ImportError:
+    _encode_result = None
+
+XSD_BOOLEAN = "http://www.w3.org/2001/XMLSchema#boolean"
+XSD_INTEGER = "http://www.w3.org/2001/XMLSchema#integer"
+
+# Returned for queries without matches (no dict building or serialization)
+EMPTY_RESULT_JSON = _dumps({
+    "head": {"vars": []},
+    "results": {"bindings": []}
+})
+
+# Constant parts of a SPARQL JSON result, around the variables and the bindings
+_RESULT_HEAD = b'{"head":{"vars":['
+_RESULT_MID = b']},"results":{"bindings":['
+_RESULT_TAIL = b"]}}"
+
+# SPARQL JSON for a single integer binding, filled in with bytes %-formatting (var is JSON-encoded)
+_SCALAR_INTEGER_RESULT = (
+    b'{"head":{"vars":[%(var)s]},"results":{"bindings":[{%(var)s:'
+    b'{"type":"literal","value":"%(value)d","datatype":"' + XSD_INTEGER.encode() + b'"}}]}}'
+)
+
+
+# === SPARQL JSON cell encoders ===
+# One encoder is picked per result column from its Polars dtype, so the type
+# dispatch runs once per column instead of once per cell. Encoders return the
+# binding's JSON text, written with pre-built fragments rather than a dict per cell
+# (_json_string is the stdlib's C string escaper; it escapes exactly like _dumps).
+
+# A single tuple startswith is one C-level call (faster here than two calls or a regex)
+URI_PREFIXES = ("http://", "https://")
+
+_URI_PREFIX = '{"type":"uri","value":'
+_LITERAL_PREFIX = '{"type":"literal","value":'
+_INTEGER_SUFFIX = ',"datatype":"' + XSD_INTEGER + '"}'
+
+
+def _encode_string(value):
+    if value.startswith(URI_PREFIXES):
+        return _URI_PREFIX + _json_string(value) + "}"
+    return _LITERAL_PREFIX + _json_string(value) + "}"
+
+
+# For String columns whose cells are all URIs or all literals (see _encoder_for_column)
+def _encode_uri(value):
+    return _URI_PREFIX + _json_string(value) + "}"
+
+
+def _encode_literal(value):
+    return _LITERAL_PREFIX + _json_string(value) + "}"
+
+
+# Only two boolean bindings exist, so every cell shares one of these pre-built strings
+_BOOLEAN_BINDINGS = {
+    True: _LITERAL_PREFIX + '"true","datatype":"' + XSD_BOOLEAN + '"}',
+    False: _LITERAL_PREFIX + '"false","datatype":"' + XSD_BOOLEAN + '"}',
+}
+
+
+def _encode_boolean(value):
+    return _BOOLEAN_BINDINGS[value]
+
+
+def _encode_integer(value):
+    # str() of an int never needs escaping
+    return _LITERAL_PREFIX + '"' + str(value) + '"' + _INTEGER_SUFFIX
+
+
+def _encode_plain(value):
+    return _LITERAL_PREFIX + _json_string(str(value)) + "}"
+
+
+def _encode_any(value):
+    """
+    Per-value dispatch, for columns whose dtype does not fix the Python type.
+    Exact type checks (a pointer compare, no subclass walk) also keep bool from
+    matching int, since Polars only hands back exact int/str/bool objects.
+    """
+    value_type = type(value)
+    if value_type is int:
+        return _encode_integer(value)
+    elif value_type is str:
+        return _encode_string(value)
+    elif value_type is bool:
+        return _encode_boolean(value)
+    return _encode_plain(value)
+
+
+# Column kind codes understood by the C encoder, one per Python cell encoder
+_ENCODER_KINDS = {
+    _encode_string: 0, _encode_boolean: 1, _encode_integer: 2, _encode_plain: 3, _encode_any: 4,
+    _encode_uri: 5, _encode_literal: 6,
+}
+
+
+def _encoder_for_dtype(dtype):
+    """Return the cell encoder for a result column of the given Polars dtype."""
+    if dtype == pl.String:
+        return _encode_string
+    if dtype == pl.Boolean:
+        return _encode_boolean
+    if dtype.is_integer():
+        return _encode_integer
+    if dtype.is_numeric() or dtype.is_temporal():
+        return _encode_plain
+    return _encode_any
+
+
+# String columns at least this long are classified as all-URI / all-literal up front; the
+# vectorized check costs ~65 us per column, which only pays off around this many rows
+CLASSIFY_MIN_ROWS = 2000
+
+
+def _encoder_for_column(column: pl.Series):
+    """
+    Return the cell encoder for a result column. Long String columns are classified once
+    with a vectorized prefix check, so the per-cell URI test only runs for columns that mix
+    URIs and literals (Maplib results are typically uniform per variable).
+    """
+    encode = _encoder_for_dtype(column.dtype)
+    if encode is _encode_string and len(column) >= CLASSIFY_MIN_ROWS:
+        uri_cells = (column.str.starts_with(URI_PREFIXES[0]) | column.str.starts_with(URI_PREFIXES[1])).sum()
+        if uri_cells == 0:
+            return _encode_literal
+        if uri_cells == len(column) - column.null_count():
+            return _encode_uri
+    return encode
 
 
-def create_query_jaguar_model_tool(model: Model):
+def _encode_bindings(vars_list, columns, encoders) -> bytes:
+    """
+    Write the SPARQL JSON document into one buffer. Each column is encoded in a single
+    pass to binding strings (None where unbound), then rows are joined from those, so no
+    per-row dicts are built and the body is UTF-8 encoded once.
+    """
+    encoded_columns = []
+    for column, (var, encode) in zip(columns, encoders):
+        key = _json_string(var) + ":"
+        encoded_columns.append([None if value is None else key + encode(value) for value in column.to_list()])
+
+    rows = ["{" + ",".join(filter(None, row)) + "}" for row in zip(*encoded_columns)]
+
+    out = bytearray(_RESULT_HEAD)
+    out += ",".join(map(_json_string, vars_list)).encode()
+    out += _RESULT_MID
+    out += ",".join(rows).encode()
+    out += _RESULT_TAIL
+    return bytes(out)
+
+
+# === Cheap pre-checks, so obviously malformed (e.g. hallucinated) queries never reach Maplib ===
+# Both only reject what can never parse: a query form keyword must be present, and braces
+# must balance once string literals, IRIs and comments (which may contain any of `{`, `}`
+# or `#`) are skipped
+_QUERY_FORM = re.compile(r"\b(?:SELECT|ASK|CONSTRUCT|DESCRIBE)\b", re.IGNORECASE)
+_NON_SYNTAX_TEXT = re.compile(
+    r'"""(?:[^"\\]|\\.|"(?!""))*"""' r"|'''(?:[^'\\]|\\.|'(?!''))*'''"  # long literals, may span lines
+    r'|"(?:[^"\\\n]|\\.)*"' r"|'(?:[^'\\\n]|\\.)*'"  # short literals
+    r"|<[^<>\s]*>|#[^\n]*"  # IRIs and comments
+)
+
+
+# Results at least this long are encoded by Polars instead of cell by cell in Python
+# (when the C encoder is not built; below this, Polars' per-call overhead dominates)
+POLARS_ENCODE_MIN_ROWS = 1000
+
+
+def _binding_expr(var: str, dtype):
+    """
+    Polars expression giving the `"var":{...}` JSON of each cell (null where unbound), for
+    the dtypes whose encoding Polars reproduces exactly; None for any other dtype.
+    struct.json_encode escapes strings like _dumps does.
+    """
+    column = pl.col(var)
+    if dtype == pl.String:
+        is_uri = column.str.starts_with(URI_PREFIXES[0]) | column.str.starts_with(URI_PREFIXES[1])
+        binding = pl.struct(
+            type=pl.when(is_uri).then(pl.lit("uri")).otherwise(pl.lit("literal")),
+            value=column,
+        ).struct.json_encode()
+    elif dtype == pl.Boolean:
+        binding = pl.when(column).then(pl.lit(_BOOLEAN_BINDINGS[True])).otherwise(pl.lit(_BOOLEAN_BINDINGS[False]))
+    elif dtype.is_integer():
+        binding = pl.concat_str([pl.lit(_LITERAL_PREFIX + '"'), column.cast(pl.String), pl.lit('"' + _INTEGER_SUFFIX)])
+    else:
+        return None
+    return pl.when(column.is_not_null()).then(pl.concat_str([pl.lit(_json_string(var) + ":"), binding]))
+
+
+def _encode_bindings_polars(result_df: pl.DataFrame):
+    """
+    Encode a large result entirely in Polars: every cell, row object and the comma-joined
+    bindings are built by the (multi-threaded) engine, and Python only frames the bytes.
+    Returns None if a column has a dtype only the Python encoders handle.
+    """
+    bindings = [_binding_expr(var, dtype) for var, dtype in result_df.schema.items()]
+    if any(binding is None for binding in bindings):
+        return None
+
+    body = result_df.select(
+        pl.concat_str([pl.lit("{"), pl.concat_str(bindings, separator=",", ignore_nulls=True), pl.lit("}")])
+        .str.join(",")
+    ).item()
+
+    out = bytearray(_RESULT_HEAD)
+    out += ",".join(map(_json_string, result_df.columns)).encode()
+    out += _RESULT_MID
+    out += body.encode()
+    out += _RESULT_TAIL
+    return bytes(out)
+
+
+# Maplib has no prepared-query handle, so the reusable per-query work on this side is the
+# validation and normalization below. Both are pure functions of the query text and are
+# memoized per unique string: this is the large, cheap tier in front of the smaller
+# per-tool result cache.
+QUERY_PLAN_CACHE_SIZE = 512
+
+
+@functools.lru_cache(maxsize=QUERY_PLAN_CACHE_SIZE)
+def _check_query(sparql_query: str):
+    """Return why the query can't be valid SPARQL, or None if it should be sent to Maplib."""
+    if not _QUERY_FORM.search(sparql_query):
+        return "Not a SPARQL query: expected SELECT, ASK, CONSTRUCT or DESCRIBE"
+    syntax = _NON_SYNTAX_TEXT.sub("", sparql_query)
+    opening, closing = syntax.count("{"), syntax.count("}")
+    if opening != closing:
+        return f"Unbalanced braces in SPARQL query: {opening} '{{' vs {closing} '}}'"
+    return None
+
+
+# Error payload returned by the tool. Errors are frequent with hallucinated SPARQL, so it
+# is filled in directly (compact, like result JSON) instead of dumping a dict
+_ERROR_JSON = '{"error":%s,"query":%s,"note":%s}'
+
+
+def _error_json(message: str, sparql_query: str, note: str) -> str:
+    """Error payload returned by the tool; each field is escaped by the C string encoder."""
+    return _ERROR_JSON % (_json_string(message), _json_string(sparql_query), _json_string(note))
+
+
+# What a prepared-query parameter may contain depends on its slot, told apart by the
+# template text right before it. Each is an allowlist, so a value can never close its
+# term (e.g. `ElJefe AS ?x) ...`) and inject SPARQL.
+_PARAM_SLOTS = {
+    # `:{name}` / `ont:{name}`: the local part of a prefixed name, same characters as the
+    # resource IRIs built in main.py (letters, digits, `_-.` and %-escapes; no leading
+    # or trailing dot, which SPARQL forbids)
+    "local name": re.compile(r"(?:\w|%[0-9A-Fa-f]{2})(?:(?:[\w.\-]|%[0-9A-Fa-f]{2})*(?:[\w\-]|%[0-9A-Fa-f]{2}))?"),
+    # `"{gender}"` / `'{gender}'`: text inside a string literal
+    "literal text": re.compile(r"[\w .,:;()/\-]*"),
+    # anything else, e.g. `LIMIT {n}`
+    "number": re.compile(r"-?\d+(?:\.\d+)?"),
+}
+
+
+def _slot_kind(preceding_text: str) -> str:
+    """Kind of parameter slot following the given template text (see _PARAM_SLOTS)."""
+    if preceding_text.endswith(":"):
+        return "local name"
+    if preceding_text.endswith(('"', "'")):
+        return "literal text"
+    return "number"
+
+
+class _SparqlEscapeMap(dict):
+    """Parameter mapping for str.format_map that only accepts values allowed in their slots."""
+
+    def __init__(self, params, slots):
+        super().__init__(params)
+        self.slots = slots
+
+    def __getitem__(self, key):
+        value = str(dict.__getitem__(self, key))
+        for kind in self.slots[key]:
+            if not _PARAM_SLOTS[kind].fullmatch(value):
+                raise ValueError(f"Invalid value for query parameter {key!r} (expected {kind}): {value!r}")
+        return value
+
+    def __missing__(self, key):
+        raise ValueError(f"Missing value for query parameter {key!r}")
+
+
+def _prepare_template(name: str, template: str):
+    """
+    Validate a prepared query once, when it is registered, and return it with the slot
+    kinds of each parameter. Templates use str.format syntax: `{param}` is a parameter
+    and literal SPARQL braces are written `{{ }}`. Only plain `{param}` fields are allowed;
+    attribute or index lookups (`{p.x}`, `{p[0]}`), positional fields, conversions (`!r`)
+    and format specs (`:>3`) would bypass the per-slot checks, so they are rejected.
+    """
+    parts = []
+    slots = {}
+    for literal, field, format_spec, conversion in string.Formatter().parse(template):
+        if field is not None:
+            if not field.isidentifier():
+                raise ValueError(f"Invalid prepared query {name!r}: parameter {{{field}}} must be a plain name")
+            if conversion is not None or format_spec:
+                raise ValueError(f"Invalid prepared query {name!r}: parameter {field!r} cannot use a conversion or format spec")
+            slots.setdefault(field, set()).add(_slot_kind(literal))
+        parts.append((literal, field))
+
+    # Check the skeleton with every parameter filled by a placeholder term
+    skeleton = "".join(literal + ("x" if field is not None else "") for literal, field in parts)
+    problem = _check_query(skeleton)
+    if problem is not None:
+        raise ValueError(f"Invalid prepared query {name!r}: {problem}")
+    return template, slots
+
+
+@functools.lru_cache(maxsize=QUERY_PLAN_CACHE_SIZE)
+def _normalize_query(sparql_query: str) -> str:
+    """
+    Normalize a query for use as a cache key: strip surrounding whitespace and drop
+    leading `#` comment lines, so queries that only differ in those share one entry.
+    """
+    lines = sparql_query.strip().splitlines()
+    while lines and lines[0].lstrip().startswith("#"):
+        lines.pop(0)
+    return "\n".join(lines).strip()
+
+
+# === Tool description ===
+# The agent framework reads the tool's docstring as its description, and it embeds the
+# whole ontology. It is assembled once at import time from the constants below and
+# assigned to each tool, instead of living as a literal in the factory's closure.
+
+_ONTOLOGY_TEXT = """\
+@prefix ont: <http://example.org/ontology#>.
+@prefix : <http://example.org/resource#>.
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#>.
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#>.
+@prefix owl: <http://www.w3.org/2002/07/owl#>.
+
+#############################
+# Ontology Classes          #
+#############################
+
+ont:Animal a owl:Class.
+ont:Mammal a owl:Class ; rdfs:subClassOf ont:Animal.
+ont:BigCat a owl:Class ; rdfs:subClassOf ont:Mammal.
+ont:Jaguar a owl:Class ; rdfs:subClassOf ont:BigCat ;
+    rdfs:comment "The Panthera onca species.".
+
+ont:Prey a owl:Class ; rdfs:subClassOf ont:Animal.
+ont:Livestock a owl:Class ; rdfs:subClassOf ont:Prey.
+ont:Herbivore a owl:Class ; rdfs:subClassOf ont:Prey.
+ont:Mesopredator a owl:Class ; rdfs:subClassOf ont:Prey.
+ont:Fish a owl:Class ; rdfs:subClassOf ont:Prey.
+ont:Reptile a owl:Class ; rdfs:subClassOf ont:Prey.
+
+ont:JaguarPopulation a owl:Class ;
+    rdfs:comment "A group or population of jaguars.".
+
+ont:Habitat a owl:Class.
+ont:Forest a owl:Class ; rdfs:subClassOf ont:Habitat.
+ont:Rainforest a owl:Class ; rdfs:subClassOf ont:Forest.
+ont:Wetland a owl:Class ; rdfs:subClassOf ont:Habitat.
+ont:Grassland a owl:Class ; rdfs:subClassOf ont:Habitat.
+ont:Shrubland a owl:Class ; rdfs:subClassOf ont:Habitat.
+ont:WaterBody a owl:Class ; rdfs:subClassOf ont:Habitat.
+
+ont:Location a owl:Class.
+ont:Country a owl:Class ; rdfs:subClassOf ont:Location.
+ont:State a owl:Class ; rdfs:subClassOf ont:Location.
+ont:Region a owl:Class ; rdfs:subClassOf ont:Location.
+ont:MountainRange a owl:Class ; rdfs:subClassOf ont:Location.
+ont:HabitatArea a owl:Class ; rdfs:subClassOf ont:Location.
+
+ont:DietType a owl:Class.
+ont:CarnivoreDiet a ont:DietType.
+
+ont:Observation a owl:Class ;
+    rdfs:label "Observation" ;
+    rdfs:comment "An event recording the sighting of an animal.".
+
+ont:Person a owl:Class ;
+    rdfs:label "Person" ;
+    rdfs:comment "A human observer or researcher involved in recording animal sightings.".
+ont:Researcher a owl:Class ; rdfs:subClassOf ont:Person.
+ont:Rancher a owl:Class ; rdfs:subClassOf ont:Person.
+ont:Conservationist a owl:Class ; rdfs:subClassOf ont:Person.
+ont:IndigenousPerson a owl:Class ; rdfs:subClassOf ont:Person.
+ont:Tourist a owl:Class ; rdfs:subClassOf ont:Person.
+ont:LawEnforcement a owl:Class ; rdfs:subClassOf ont:Person.
+
+ont:ConservationOrganization a owl:Class ;
+    rdfs:label "Conservation Organization" ;
+    rdfs:comment "An organization involved in monitoring and protecting wildlife.".
+ont:GovernmentAgency a owl:Class ; rdfs:subClassOf ont:ConservationOrganization.
+ont:NGO a owl:Class ; rdfs:subClassOf ont:ConservationOrganization.
+ont:AcademicInstitution a owl:Class ; rdfs:subClassOf ont:ConservationOrganization.
+
+ont:Threat a owl:Class.
+ont:AnthropogenicThreat a owl:Class ; rdfs:subClassOf ont:Threat.
+ont:HabitatLoss a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
+ont:HabitatFragmentation a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
+ont:Poaching a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
+ont:IllegalWildlifeTrade a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
+ont:HumanWildlifeConflict a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
+ont:BorderBarrier a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
+ont:EnvironmentalThreat a owl:Class ; rdfs:subClassOf ont:Threat.
+ont:ClimateChange a owl:Class ; rdfs:subClassOf ont:EnvironmentalThreat.
+ont:Wildfire a owl:Class ; rdfs:subClassOf ont:EnvironmentalThreat.
+
+ont:ConservationEffort a owl:Class.
+ont:RecoveryPlan a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
+ont:WildlifeCorridor a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
+ont:RewildingProgram a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
+ont:CommunityEngagement a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
+ont:InternationalCooperation a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
+ont:MonitoringTechnique a owl:Class.
+ont:CameraTrap a owl:Class ; rdfs:subClassOf ont:MonitoringTechnique.
+ont:ScatDetection a owl:Class ; rdfs:subClassOf ont:MonitoringTechnique.
+ont:GPSTracking a owl:Class ; rdfs:subClassOf ont:MonitoringTechnique.
+
+ont:LegalFramework a owl:Class.
+ont:Act a owl:Class ; rdfs:subClassOf ont:LegalFramework.
+ont:Convention a owl:Class ; rdfs:subClassOf ont:LegalFramework.
+
+ont:CulturalSignificance a owl:Class.
+ont:EconomicBenefit a owl:Class.
+
+ont:Event a owl:Class. # For specific events like rescue, release, death
+
+#############################
+# Ontology Properties #
+#############################
+
+ont:hasObservation a owl:ObjectProperty ;
+    rdfs:domain ont:Animal ;
+    rdfs:range ont:Observation ;
+    rdfs:comment "Links an animal to one of its observation events.".
+
+ont:observedDate a owl:DatatypeProperty ;
+    rdfs:domain ont:Observation ;
+    rdfs:range xsd:date ;
+    rdfs:comment "The date on which the observation took place.".
+
+ont:observedBy a owl:ObjectProperty ;
+    rdfs:domain ont:Observation ;
+    rdfs:range ont:Person ;
+    rdfs:comment "The person who recorded the observation.".
+
+ont:monitoredByOrg a owl:ObjectProperty ;
+    rdfs:domain ont:Animal ;
+    rdfs:range ont:ConservationOrganization ;
+    rdfs:comment "Links an animal to the conservation organization that monitors it.".
+
+ont:monitoredByTechnique a owl:ObjectProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range ont:MonitoringTechnique ;
+    rdfs:comment "Indicates the technique used to monitor the jaguar.".
+
+ont:locatedInCountry a owl:ObjectProperty ;
+    rdfs:domain ont:State ;
+    rdfs:range ont:Country ;
+    rdfs:comment "Specifies the country in which a state is located.".
+
+ont:locatedIn a owl:ObjectProperty ;
+    rdfs:domain ont:Habitat ;
+    rdfs:range ont:Location ;
+    rdfs:comment "Specifies the state or administrative region in which a habitat is located.".
+
+ont:occursIn a owl:ObjectProperty ;
+    rdfs:domain ont:Animal ;
+    rdfs:range ont:Location ;
+    rdfs:comment "Indicates a state where an animal has been observed or is known to occur.".
+
+ont:name a owl:DatatypeProperty ;
+    rdfs:domain ont:Animal ;
+    rdfs:range xsd:string.
+
+ont:habitat a owl:ObjectProperty ;
+    rdfs:domain ont:Animal ;
+    rdfs:range ont:Habitat.
+
+ont:hasDietType a owl:ObjectProperty ;
+    rdfs:domain ont:Animal ;
+    rdfs:range ont:DietType.
+
+ont:hasLifespan a owl:DatatypeProperty ;
+    rdfs:domain ont:Animal ;
+    rdfs:range xsd:integer ;
+    rdfs:comment "Lifespan in years.".
+
+ont:scientificName a owl:DatatypeProperty ;
+    rdfs:domain ont:Animal ;
+    rdfs:range xsd:string.
+
+ont:hasGender a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:string ;
+    rdfs:comment "Gender of the jaguar (e.g., Male, Female).".
+
+ont:hasIdentificationMark a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:string ;
+    rdfs:comment "Unique spot pattern or other distinguishing mark.".
+
+ont:hasMonitoringStartDate a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:date ;
+    rdfs:comment "Date when monitoring of the individual jaguar began.".
+
+ont:hasLastSightingDate a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:date ;
+    rdfs:comment "Date of the last confirmed sighting of the individual jaguar.".
+
+ont:wasKilled a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:boolean ;
+    rdfs:comment "Indicates if the jaguar was killed.".
+
+ont:causeOfDeath a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:string ;
+    rdfs:comment "The cause of death for the jaguar.".
+
+ont:originatesFrom a owl:ObjectProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range ont:Location ;
+    rdfs:comment "Indicates the origin location of a dispersing jaguar.".
+
+ont:hasOffspring a owl:ObjectProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range ont:Jaguar ;
+    rdfs:comment "Links a jaguar to its offspring.".
+
+ont:isOrphaned a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:boolean ;
+    rdfs:comment "Indicates if the jaguar was orphaned.".
+
+ont:isRehabilitated a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:boolean ;
+    rdfs:comment "Indicates if the jaguar underwent rehabilitation.".
+
+ont:isReleased a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:boolean ;
+    rdfs:comment "Indicates if the jaguar was released into the wild.".
+
+ont:rescuedBy a owl:ObjectProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range ont:ConservationOrganization ;
+    rdfs:comment "The organization that rescued the jaguar.".
+
+ont:reintroducedBy a owl:ObjectProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range ont:ConservationOrganization ;
+    rdfs:comment "The organization that reintroduced the jaguar.".
+
+ont:hasRescueDate a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:date ;
+    rdfs:comment "Date of the jaguar's rescue.".
+
+ont:hasReleaseDate a owl:DatatypeProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range xsd:date ;
+    rdfs:comment "Date of the jaguar's release.".
+
+ont:facesThreat a owl:ObjectProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range ont:Threat ;
+    rdfs:comment "Indicates a threat faced by the jaguar.".
+
+ont:implementsEffort a owl:ObjectProperty ;
+    rdfs:domain ont:ConservationOrganization ;
+    rdfs:range ont:ConservationEffort ;
+    rdfs:comment "Indicates a conservation effort implemented by an organization.".
+
+ont:connectsHabitat a owl:ObjectProperty ;
+    rdfs:domain ont:WildlifeCorridor ;
+    rdfs:range ont:HabitatArea ;
+    rdfs:comment "Indicates which habitat areas a wildlife corridor connects.".
+
+ont:hasAcreage a owl:DatatypeProperty ;
+    rdfs:domain ont:HabitatArea ;
+    rdfs:range xsd:integer ;
+    rdfs:comment "The size of the habitat area in acres.".
+
+ont:hasPopulationEstimate a owl:DatatypeProperty ;
+    rdfs:domain ont:JaguarPopulation ;
+    rdfs:range xsd:integer ;
+    rdfs:comment "Estimated number of jaguars in a population.".
+
+ont:isDependentOn a owl:ObjectProperty ;
+    rdfs:domain ont:JaguarPopulation ;
+    rdfs:range ont:JaguarPopulation ;
+    rdfs:comment "Indicates if one jaguar population is dependent on another (e.g., for dispersal).".
+
+ont:namedBy a owl:ObjectProperty ;
+    rdfs:domain ont:Jaguar ;
+    rdfs:range ont:Person ;
+    rdfs:comment "The person or group who named the jaguar.".
+"""
+
+_EXAMPLES = """\
+SPARQL Query Examples:
+- Find by [Name]:
+    @prefix ont: <http://example.org/ontology#>.
+    @prefix : <http://example.org/resource#>.
+    SELECT ?jaguar ?label WHERE {
+    BIND(:[Name] AS ?jaguar)
+    OPTIONAL { ?jaguar rdfs:label ?label . }
+    }
+
+- Find all properties about [Name]:
+    @prefix ont: <http://example.org/ontology#>.
+    @prefix : <http://example.org/resource#>.
+    SELECT ?jaguar ?p ?o WHERE {
+    BIND(:[Name] AS ?jaguar)
+    OPTIONAL { ?jaguar ?p ?o . }
+    }
+
+- Find by gender:
+@prefix ont: <http://example.org/ontology#>.
+@prefix : <http://example.org/resource#>.
+SELECT ?jaguar ?label ?gender WHERE
+{ ?jaguar a ont:Jaguar .
+OPTIONAL { ?jaguar rdfs:label ?label . }
+OPTIONAL { ?jaguar ont:hasGender ?gender . } }
+
+- Find killed jaguars:
+@prefix ont: <http://example.org/ontology#>.
+@prefix : <http://example.org/resource#>.
+SELECT ?jaguar ?label ?causeOfDeath WHERE {
+?jaguar a ont:Jaguar .
+?jaguar ont:wasKilled true .
+OPTIONAL { ?jaguar rdfs:label ?label . }
+OPTIONAL { ?jaguar ont:causeOfDeath ?causeOfDeath . } }
+
+- Count jaguars:
+
+@prefix ont: <http://example.org/ontology#>.
+@prefix : <http://example.org/resource#>.
+SELECT (COUNT(?jaguar) as ?count) WHERE { ?jaguar a ont:Jaguar . }
+
+
+- Always try to make a simple query first and only add complexity if needed.
+- Always include relevant prefixes in the query.
+"""
+
+
+def _build_description(ontology: str, examples: str) -> str:
+    """Tool description: what the tool is for, the ontology to query against and example queries."""
+    return "\n".join((
+        "Query the jaguar knowledge graph using SPARQL via Maplib. Use this tool when users ask questions about jaguars, jaguar populations, conservation efforts, habitats, threats, or any jaguar-related data. You must generate a valid SPARQL query based on the jaguar ontology. The tool will return raw JSON results that you must interpret and convert into natural language responses for the user.",
+        "",
+        "Args:",
+        "    sparql_query: A valid SPARQL query to execute against the jaguar GraphDB aligning with this ontology:",
+        "",
+        textwrap.indent(ontology, "    "),
+        textwrap.indent(examples, "    "),
+        "Returns:",
+        "    JSON string containing query results from Maplib in-memory knowledge graph (SPARQL JSON format)",
+    ))
+
+
+_DESCRIPTION = _build_description(_ONTOLOGY_TEXT, _EXAMPLES)
+
+
+def create_query_jaguar_model_tool(model: Model, *, return_bytes: bool = False, templates: dict[str, str] | None = None):
     """
     Create a query tool function bound to a specific Maplib model. In this case with hardcoded description
     This is necessary to be able to pass the model to the tool without breaking the tool calling pattern for the agent. 
     
     Args:
         model: Initialized Maplib Model with knowledge graph
+        return_bytes: Return UTF-8 JSON bytes instead of str, for callers that write the
+            result straight to a byte stream (e.g. an HTTP response) and would only re-encode it
+        templates: Named prepared queries, e.g.
+            {"find_by_name": "SELECT ?label WHERE {{ BIND(:{name} AS ?j) ?j rdfs:label ?label }}"},
+            run with `query_model_tool.query_prepared("find_by_name", name="El_Jefe")`; each value must
+            fit its slot (local name after `:`, text inside quotes, otherwise a number)
     
     Returns:
         Function that queries the jaguar knowledge graph
     """
+    # Templates are checked here once instead of on every call
+    prepared = {name: _prepare_template(name, template) for name, template in (templates or {}).items()}
+
+    # Results are built as UTF-8 bytes; only decode them if the caller wants str
+    finish = (lambda out: out) if return_bytes else bytes.decode
     
-    def query_model_tool(sparql_query: str) -> str:
+    @functools.lru_cache(maxsize=256)
+    def _run(sparql_query: str) -> str | bytes:
         """
-        Query the jaguar knowledge graph using SPARQL via Maplib. Use this tool when users ask questions about jaguars, jaguar populations, conservation efforts, habitats, threats, or any jaguar-related data. You must generate a valid SPARQL query based on the jaguar ontology. The tool will return raw JSON results that you must interpret and convert into natural language responses for the user.
-        
-        Args:
-            sparql_query: A valid SPARQL query to execute against the jaguar GraphDB aligning with this ontology:
-        
-        @prefix ont: <http://example.org/ontology#>.
-        @prefix : <http://example.org/resource#>.
-        @prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#>.
-        @prefix xsd: <http://www.w3.org/2001/XMLSchema#>.
-        @prefix owl: <http://www.w3.org/2002/07/owl#>.
-
-        #############################
-        # Ontology Classes          #
-        #############################
-
-        ont:Animal a owl:Class.
-        ont:Mammal a owl:Class ; rdfs:subClassOf ont:Animal.
-        ont:BigCat a owl:Class ; rdfs:subClassOf ont:Mammal.
-        ont:Jaguar a owl:Class ; rdfs:subClassOf ont:BigCat ;
-            rdfs:comment "The Panthera onca species.".
-
-        ont:Prey a owl:Class ; rdfs:subClassOf ont:Animal.
-        ont:Livestock a owl:Class ; rdfs:subClassOf ont:Prey.
-        ont:Herbivore a owl:Class ; rdfs:subClassOf ont:Prey.
-        ont:Mesopredator a owl:Class ; rdfs:subClassOf ont:Prey.
-        ont:Fish a owl:Class ; rdfs:subClassOf ont:Prey.
-        ont:Reptile a owl:Class ; rdfs:subClassOf ont:Prey.
-
-        ont:JaguarPopulation a owl:Class ;
-            rdfs:comment "A group or population of jaguars.".
-
-        ont:Habitat a owl:Class.
-        ont:Forest a owl:Class ; rdfs:subClassOf ont:Habitat.
-        ont:Rainforest a owl:Class ; rdfs:subClassOf ont:Forest.
-        ont:Wetland a owl:Class ; rdfs:subClassOf ont:Habitat.
-        ont:Grassland a owl:Class ; rdfs:subClassOf ont:Habitat.
-        ont:Shrubland a owl:Class ; rdfs:subClassOf ont:Habitat.
-        ont:WaterBody a owl:Class ; rdfs:subClassOf ont:Habitat.
-
-        ont:Location a owl:Class.
-        ont:Country a owl:Class ; rdfs:subClassOf ont:Location.
-        ont:State a owl:Class ; rdfs:subClassOf ont:Location.
-        ont:Region a owl:Class ; rdfs:subClassOf ont:Location.
-        ont:MountainRange a owl:Class ; rdfs:subClassOf ont:Location.
-        ont:HabitatArea a owl:Class ; rdfs:subClassOf ont:Location.
-
-        ont:DietType a owl:Class.
-        ont:CarnivoreDiet a ont:DietType.
-
-        ont:Observation a owl:Class ;
-            rdfs:label "Observation" ;
-            rdfs:comment "An event recording the sighting of an animal.".
-
-        ont:Person a owl:Class ;
-            rdfs:label "Person" ;
-            rdfs:comment "A human observer or researcher involved in recording animal sightings.".
-        ont:Researcher a owl:Class ; rdfs:subClassOf ont:Person.
-        ont:Rancher a owl:Class ; rdfs:subClassOf ont:Person.
-        ont:Conservationist a owl:Class ; rdfs:subClassOf ont:Person.
-        ont:IndigenousPerson a owl:Class ; rdfs:subClassOf ont:Person.
-        ont:Tourist a owl:Class ; rdfs:subClassOf ont:Person.
-        ont:LawEnforcement a owl:Class ; rdfs:subClassOf ont:Person.
-
-        ont:ConservationOrganization a owl:Class ;
-            rdfs:label "Conservation Organization" ;
-            rdfs:comment "An organization involved in monitoring and protecting wildlife.".
-        ont:GovernmentAgency a owl:Class ; rdfs:subClassOf ont:ConservationOrganization.
-        ont:NGO a owl:Class ; rdfs:subClassOf ont:ConservationOrganization.
-        ont:AcademicInstitution a owl:Class ; rdfs:subClassOf ont:ConservationOrganization.
-
-        ont:Threat a owl:Class.
-        ont:AnthropogenicThreat a owl:Class ; rdfs:subClassOf ont:Threat.
-        ont:HabitatLoss a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
-        ont:HabitatFragmentation a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
-        ont:Poaching a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
-        ont:IllegalWildlifeTrade a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
-        ont:HumanWildlifeConflict a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
-        ont:BorderBarrier a owl:Class ; rdfs:subClassOf ont:AnthropogenicThreat.
-        ont:EnvironmentalThreat a owl:Class ; rdfs:subClassOf ont:Threat.
-        ont:ClimateChange a owl:Class ; rdfs:subClassOf ont:EnvironmentalThreat.
-        ont:Wildfire a owl:Class ; rdfs:subClassOf ont:EnvironmentalThreat.
-
-        ont:ConservationEffort a owl:Class.
-        ont:RecoveryPlan a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
-        ont:WildlifeCorridor a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
-        ont:RewildingProgram a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
-        ont:CommunityEngagement a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
-        ont:InternationalCooperation a owl:Class ; rdfs:subClassOf ont:ConservationEffort.
-        ont:MonitoringTechnique a owl:Class.
-        ont:CameraTrap a owl:Class ; rdfs:subClassOf ont:MonitoringTechnique.
-        ont:ScatDetection a owl:Class ; rdfs:subClassOf ont:MonitoringTechnique.
-        ont:GPSTracking a owl:Class ; rdfs:subClassOf ont:MonitoringTechnique.
-
-        ont:LegalFramework a owl:Class.
-        ont:Act a owl:Class ; rdfs:subClassOf ont:LegalFramework.
-        ont:Convention a owl:Class ; rdfs:subClassOf ont:LegalFramework.
-
-        ont:CulturalSignificance a owl:Class.
-        ont:EconomicBenefit a owl:Class.
-
-        ont:Event a owl:Class. # For specific events like rescue, release, death
-
-        #############################
-        # Ontology Properties #
-        #############################
-
-        ont:hasObservation a owl:ObjectProperty ;
-            rdfs:domain ont:Animal ;
-            rdfs:range ont:Observation ;
-            rdfs:comment "Links an animal to one of its observation events.".
-
-        ont:observedDate a owl:DatatypeProperty ;
-            rdfs:domain ont:Observation ;
-            rdfs:range xsd:date ;
-            rdfs:comment "The date on which the observation took place.".
-
-        ont:observedBy a owl:ObjectProperty ;
-            rdfs:domain ont:Observation ;
-            rdfs:range ont:Person ;
-            rdfs:comment "The person who recorded the observation.".
-
-        ont:monitoredByOrg a owl:ObjectProperty ;
-            rdfs:domain ont:Animal ;
-            rdfs:range ont:ConservationOrganization ;
-            rdfs:comment "Links an animal to the conservation organization that monitors it.".
-
-        ont:monitoredByTechnique a owl:ObjectProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range ont:MonitoringTechnique ;
-            rdfs:comment "Indicates the technique used to monitor the jaguar.".
-
-        ont:locatedInCountry a owl:ObjectProperty ;
-            rdfs:domain ont:State ;
-            rdfs:range ont:Country ;
-            rdfs:comment "Specifies the country in which a state is located.".
-
-        ont:locatedIn a owl:ObjectProperty ;
-            rdfs:domain ont:Habitat ;
-            rdfs:range ont:Location ;
-            rdfs:comment "Specifies the state or administrative region in which a habitat is located.".
-
-        ont:occursIn a owl:ObjectProperty ;
-            rdfs:domain ont:Animal ;
-            rdfs:range ont:Location ;
-            rdfs:comment "Indicates a state where an animal has been observed or is known to occur.".
-
-        ont:name a owl:DatatypeProperty ;
-            rdfs:domain ont:Animal ;
-            rdfs:range xsd:string.
-
-        ont:habitat a owl:ObjectProperty ;
-            rdfs:domain ont:Animal ;
-            rdfs:range ont:Habitat.
-
-        ont:hasDietType a owl:ObjectProperty ;
-            rdfs:domain ont:Animal ;
-            rdfs:range ont:DietType.
-
-        ont:hasLifespan a owl:DatatypeProperty ;
-            rdfs:domain ont:Animal ;
-            rdfs:range xsd:integer ;
-            rdfs:comment "Lifespan in years.".
-
-        ont:scientificName a owl:DatatypeProperty ;
-            rdfs:domain ont:Animal ;
-            rdfs:range xsd:string.
-
-        ont:hasGender a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:string ;
-            rdfs:comment "Gender of the jaguar (e.g., Male, Female).".
-
-        ont:hasIdentificationMark a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:string ;
-            rdfs:comment "Unique spot pattern or other distinguishing mark.".
-
-        ont:hasMonitoringStartDate a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:date ;
-            rdfs:comment "Date when monitoring of the individual jaguar began.".
-
-        ont:hasLastSightingDate a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:date ;
-            rdfs:comment "Date of the last confirmed sighting of the individual jaguar.".
-
-        ont:wasKilled a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:boolean ;
-            rdfs:comment "Indicates if the jaguar was killed.".
-
-        ont:causeOfDeath a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:string ;
-            rdfs:comment "The cause of death for the jaguar.".
-
-        ont:originatesFrom a owl:ObjectProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range ont:Location ;
-            rdfs:comment "Indicates the origin location of a dispersing jaguar.".
-
-        ont:hasOffspring a owl:ObjectProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range ont:Jaguar ;
-            rdfs:comment "Links a jaguar to its offspring.".
-
-        ont:isOrphaned a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:boolean ;
-            rdfs:comment "Indicates if the jaguar was orphaned.".
-
-        ont:isRehabilitated a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:boolean ;
-            rdfs:comment "Indicates if the jaguar underwent rehabilitation.".
-
-        ont:isReleased a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:boolean ;
-            rdfs:comment "Indicates if the jaguar was released into the wild.".
-
-        ont:rescuedBy a owl:ObjectProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range ont:ConservationOrganization ;
-            rdfs:comment "The organization that rescued the jaguar.".
-
-        ont:reintroducedBy a owl:ObjectProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range ont:ConservationOrganization ;
-            rdfs:comment "The organization that reintroduced the jaguar.".
-
-        ont:hasRescueDate a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:date ;
-            rdfs:comment "Date of the jaguar's rescue.".
-
-        ont:hasReleaseDate a owl:DatatypeProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range xsd:date ;
-            rdfs:comment "Date of the jaguar's release.".
-
-        ont:facesThreat a owl:ObjectProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range ont:Threat ;
-            rdfs:comment "Indicates a threat faced by the jaguar.".
-
-        ont:implementsEffort a owl:ObjectProperty ;
-            rdfs:domain ont:ConservationOrganization ;
-            rdfs:range ont:ConservationEffort ;
-            rdfs:comment "Indicates a conservation effort implemented by an organization.".
-
-        ont:connectsHabitat a owl:ObjectProperty ;
-            rdfs:domain ont:WildlifeCorridor ;
-            rdfs:range ont:HabitatArea ;
-            rdfs:comment "Indicates which habitat areas a wildlife corridor connects.".
-
-        ont:hasAcreage a owl:DatatypeProperty ;
-            rdfs:domain ont:HabitatArea ;
-            rdfs:range xsd:integer ;
-            rdfs:comment "The size of the habitat area in acres.".
-
-        ont:hasPopulationEstimate a owl:DatatypeProperty ;
-            rdfs:domain ont:JaguarPopulation ;
-            rdfs:range xsd:integer ;
-            rdfs:comment "Estimated number of jaguars in a population.".
-
-        ont:isDependentOn a owl:ObjectProperty ;
-            rdfs:domain ont:JaguarPopulation ;
-            rdfs:range ont:JaguarPopulation ;
-            rdfs:comment "Indicates if one jaguar population is dependent on another (e.g., for dispersal).".
-
-        ont:namedBy a owl:ObjectProperty ;
-            rdfs:domain ont:Jaguar ;
-            rdfs:range ont:Person ;
-            rdfs:comment "The person or group who named the jaguar.".
-                
-                
-        SPARQL Query Examples:
-        - Find by [Name]:
-            @prefix ont: <http://example.org/ontology#>.
-            @prefix : <http://example.org/resource#>.
-            SELECT ?jaguar ?label WHERE {
-            BIND(:[Name] AS ?jaguar)
-            OPTIONAL { ?jaguar rdfs:label ?label . }
-            }
-
-        - Find all properties about [Name]:            
-            @prefix ont: <http://example.org/ontology#>.
-            @prefix : <http://example.org/resource#>.
-            SELECT ?jaguar ?p ?o WHERE {
-            BIND(:[Name] AS ?jaguar)
-            OPTIONAL { ?jaguar ?p ?o . }
-            }
-            
-        - Find by gender:       
-        @prefix ont: <http://example.org/ontology#>.
-        @prefix : <http://example.org/resource#>.
-        SELECT ?jaguar ?label ?gender WHERE 
-        { ?jaguar a ont:Jaguar . 
-        OPTIONAL { ?jaguar rdfs:label ?label . } 
-        OPTIONAL { ?jaguar ont:hasGender ?gender . } }
-        
-        - Find killed jaguars:                 
-        @prefix ont: <http://example.org/ontology#>.
-        @prefix : <http://example.org/resource#>.
-        SELECT ?jaguar ?label ?causeOfDeath WHERE { 
-        ?jaguar a ont:Jaguar . 
-        ?jaguar ont:wasKilled true . 
-        OPTIONAL { ?jaguar rdfs:label ?label . } 
-        OPTIONAL { ?jaguar ont:causeOfDeath ?causeOfDeath . } }
-        
-        - Count jaguars: 
-        
-        @prefix ont: <http://example.org/ontology#>.
-        @prefix : <http://example.org/resource#>.
-        SELECT (COUNT(?jaguar) as ?count) WHERE { ?jaguar a ont:Jaguar . }
-        
-        
-        - Always try to make a simple query first and only add complexity if needed.
-        - Always include relevant prefixes in the query.
-    
-    Returns:
-        JSON string containing query results from Maplib in-memory knowledge graph (SPARQL JSON format)
+        Execute a normalized query and return the SPARQL JSON string. Results are cached
+        per query, since agents often repeat the same query across turns. Errors are
+        raised rather than cached.
         """
+        # Model is provided from the closure (initialized in main.py)
+        # Execute SPARQL query using Maplib
+        result_df = model.query(sparql_query)
+
+        # Convert Polars DataFrame to SPARQL JSON format
+        # This maintains compatibility with existing agent code
+        if result_df is None or len(result_df) == 0:
+            return finish(EMPTY_RESULT_JSON)
+
+        # Scalar aggregates (e.g. SELECT (COUNT(?jaguar) as ?count)) give a 1x1 integer
+        # frame: write that JSON directly instead of going through the bindings path
+        if result_df.shape == (1, 1) and result_df.dtypes[0].is_integer():
+            value = result_df.item()
+            if value is not None:
+                return finish(_SCALAR_INTEGER_RESULT % {b"var": _dumps(result_df.columns[0]), b"value": value})
+
+        # Get column names (SPARQL variables)
+        vars_list = result_df.columns
+
+        # Convert rows to SPARQL JSON bindings format
+        # Work column by column: pick each column's encoder once from its dtype (simplified -
+        # Maplib handles RDF types) and convert each column to Python in one call
+        columns = result_df.get_columns()
+        if _encode_result is not None:
+            encoders = [(column.name, _encoder_for_column(column)) for column in columns]
+            # Same JSON, written in one C loop straight from the column values
+            return finish(_encode_result(
+                vars_list,
+                [column.to_list() for column in columns],
+                [_ENCODER_KINDS[encode] for _, encode in encoders],
+            ))
+        # Without it, large results are cheaper to encode natively in Polars
+        if len(result_df) >= POLARS_ENCODE_MIN_ROWS:
+            encoded = _encode_bindings_polars(result_df)
+            if encoded is not None:
+                return finish(encoded)
+        encoders = [(column.name, _encoder_for_column(column)) for column in columns]
+        return finish(_encode_bindings(vars_list, columns, encoders))
+    
+    def query_model_tool(sparql_query: str) -> str | bytes:
+        # Docstring (the tool description) is set from _DESCRIPTION below
+        problem = _check_query(sparql_query)
+        if problem is not None:
+            return _error(problem, sparql_query, "Query rejected before reaching Maplib in-memory model")
+        return _execute(sparql_query)
+
+    def query_prepared(name: str, /, **params) -> str | bytes:
+        """Run a prepared query registered with the tool, filling in its parameters
+        (`name` is positional-only, so a template may itself take a `name` parameter)."""
+        if name not in prepared:
+            return _error(f"Unknown prepared query {name!r}", "", "Query rejected before reaching Maplib in-memory model")
+        try:
+            template, slots = prepared[name]
+            sparql_query = template.format_map(_SparqlEscapeMap(params, slots))
+        except ValueError as e:
+            return _error(str(e), template, "Query rejected before reaching Maplib in-memory model")
+        except KeyError as e:
+            return _error(f"Unknown query parameter {e}", template, "Query rejected before reaching Maplib in-memory model")
+        # Already validated at registration, and shares the result cache with raw queries
+        return _execute(sparql_query)
+
+    def _execute(sparql_query: str) -> str | bytes:
         try:
-            # Model is provided from the closure (initialized in main.py)
-            # Execute SPARQL query using Maplib
-            result_df = model.query(sparql_query.strip())
-
-            # Convert Polars DataFrame to SPARQL JSON format
-            # This maintains compatibility with existing agent code
-            if result_df is None or len(result_df) == 0:
-                return json.dumps({
-                    "head": {"vars": []},
-                    "results": {"bindings": []}
-                }, indent=2)
-
-            # Get column names (SPARQL variables)
-            vars_list = result_df.columns
-
-            # Convert rows to SPARQL JSON bindings format
-            bindings = []
-            for row in result_df.iter_rows(named=True):
-                binding = {}
-                for var, value in row.items():
-                    if value is not None:
-                        # Determine type (simplified - Maplib handles RDF types)
-                        if isinstance(value, str):
-                            if value.startswith("http://") or value.startswith("https://"):
-                                binding[var] = {"type": "uri", "value": value}
-                            else:
-                                binding[var] = {"type": "literal", "value": value}
-                        elif isinstance(value, bool):
-                            binding[var] = {
-                                "type": "literal",
-                                "value": str(value).lower(),
-                                "datatype": "http://www.w3.org/2001/XMLSchema#boolean"
-                            }
-                        elif isinstance(value, int):
-                            binding[var] = {
-                                "type": "literal",
-                                "value": str(value),
-                                "datatype": "http://www.w3.org/2001/XMLSchema#integer"
-                            }
-                        else:
-                            binding[var] = {"type": "literal", "value": str(value)}
-                bindings.append(binding)
-
-            result = {
-                "head": {"vars": vars_list},
-                "results": {"bindings": bindings}
-            }
-
-            return json.dumps(result, indent=2)
+            return _run(_normalize_query(sparql_query))
 
         except Exception as e:
-            return json.dumps({
-                "error": str(e),
-                "query": sparql_query,
-                "note": "Query executed against Maplib in-memory model"
-            }, indent=2)
+            return _error(str(e), sparql_query, "Query executed against Maplib in-memory model")
+
+    def _error(message: str, sparql_query: str, note: str) -> str | bytes:
+        error_json = _error_json(message, sparql_query, note)
+        return error_json.encode() if return_bytes else error_json
+    
+    query_model_tool.__doc__ = _DESCRIPTION
+    # The agent framework reads the signature, so state the one type this tool returns
+    query_model_tool.__annotations__["return"] = bytes if return_bytes else str
+    query_prepared.__annotations__["return"] = bytes if return_bytes else str
+    # Lets callers drop cached results if the model is mutated after the tool is created
+    query_model_tool.cache_clear = _run.cache_clear
+    query_model_tool.query_prepared = query_prepared
     
-    return query_model_tool
\ No newline at end of file
+    return query_model_tool
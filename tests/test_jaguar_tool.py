@@ -0,0 +1,180 @@
+import datetime
+import decimal
+import unittest
+from unittest import mock
+
+import polars as pl
+from maplib import Model
+
+from src.agents import jaguar_tool
+from src.agents.jaguar_tool import _check_query, create_query_jaguar_model_tool
+
+PREFIXES = """PREFIX ont: <http://example.org/ontology#>
+PREFIX : <http://example.org/resource#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+"""
+
+TEMPLATE = """@prefix ont: <http://example.org/ontology#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ont:Labelled [ <http://ns.ottr.xyz/0.4/IRI> ?id, <http://www.w3.org/2001/XMLSchema#string> ?label ] :: {
+  ottr:Triple(?id, a, ont:Jaguar),
+  ottr:Triple(?id, rdfs:label, ?label)
+} .
+"""
+
+
+def _small_model():
+    """Two labelled jaguars, enough to tell one jaguar's label from all of them."""
+    model = Model()
+    model.add_template(TEMPLATE)
+    model.map("http://example.org/ontology#Labelled", pl.DataFrame({
+        "id": ["http://example.org/resource#ElJefe", "http://example.org/resource#Sombra"],
+        "label": ["El Jefe", "Sombra"],
+    }))
+    return model
+
+
+class CheckQueryTest(unittest.TestCase):
+    def test_rejects_unbalanced_braces_and_missing_query_form(self):
+        self.assertIsNotNone(_check_query(PREFIXES + "SELECT ?j WHERE { ?j a ont:Jaguar "))
+        self.assertIsNotNone(_check_query("garbage query"))
+
+    def test_ignores_braces_in_literals_iris_and_comments(self):
+        query = PREFIXES + 'SELECT ?j WHERE { ?j rdfs:label ?l . FILTER(?l != "{" && ?l != \'}\') } # {'
+        self.assertIsNone(_check_query(query))
+
+    def test_ignores_braces_in_multiline_long_literals(self):
+        query = PREFIXES + 'SELECT ?l WHERE { ?j rdfs:label ?l . FILTER(?l != """a\n{ b""") }'
+        self.assertIsNone(_check_query(query))
+        self.assertIsNone(_check_query(query.replace('"""', "'''")))
+
+        # Maplib itself accepts the query, so the pre-check must let it through
+        tool = create_query_jaguar_model_tool(_small_model())
+        self.assertNotIn('"error"', tool(query))
+
+
+class PreparedQueryTest(unittest.TestCase):
+    TEMPLATES = {
+        "label_of": PREFIXES + "SELECT ?label WHERE {{\n BIND(:{name} AS ?j)\n ?j rdfs:label ?label\n}}",
+        "with_label": PREFIXES + 'SELECT ?j WHERE {{ ?j rdfs:label "{label}" }} LIMIT {n}',
+    }
+
+    def setUp(self):
+        self.tool = create_query_jaguar_model_tool(_small_model(), templates=self.TEMPLATES)
+
+    def test_fills_in_parameters(self):
+        self.assertIn("El Jefe", self.tool.query_prepared("label_of", name="ElJefe"))
+        self.assertNotIn("Sombra", self.tool.query_prepared("label_of", name="ElJefe"))
+        self.assertIn("Sombra", self.tool.query_prepared("with_label", label="Sombra", n=1))
+
+    def test_accepts_escaped_and_unicode_local_names(self):
+        # Resource IRIs percent-encode unsafe characters and keep non-ASCII letters (see main._iri)
+        self.assertNotIn('"error"', self.tool.query_prepared("label_of", name="Cerrado%2C%20Brazil"))
+        self.assertNotIn('"error"', self.tool.query_prepared("label_of", name="Xamã"))
+
+    def test_rejects_values_that_break_out_of_their_slot(self):
+        result = self.tool.query_prepared("label_of", name="ElJefe AS ?x) ?j rdfs:label ?label . #")
+        self.assertIn('"error"', result)
+        self.assertNotIn("Sombra", result)
+
+        self.assertIn('"error"', self.tool.query_prepared("label_of", name="ElJefe."))
+        self.assertIn('"error"', self.tool.query_prepared("with_label", label='x" } #', n=1))
+        self.assertIn('"error"', self.tool.query_prepared("with_label", label="Sombra", n="1 OFFSET 1"))
+
+    def test_rejects_fields_that_bypass_the_slot_checks(self):
+        for field in ("{p.x}", "{p[0]}", "{}", "{0}", "{name!r}", "{name:>3}", "{name:{n}}"):
+            with self.subTest(field=field), self.assertRaises(ValueError):
+                create_query_jaguar_model_tool(_small_model(), templates={"bad": PREFIXES + "SELECT ?j WHERE {{ ?j rdfs:label " + field + " }}"})
+
+    def test_reports_lookup_errors_instead_of_raising(self):
+        # Only reachable if a template slipped past registration; it must still come back as an error
+        with mock.patch.object(jaguar_tool, "_prepare_template", lambda name, template: (template, {})):
+            tool = create_query_jaguar_model_tool(_small_model(), templates={"a": "SELECT ?j WHERE {{ ?j ?p {p.x} }}"})
+        self.assertIn('"error"', tool.query_prepared("a", p="x"))
+
+
+class _CountingModel:
+    """Wraps a Model and counts the queries that reach it."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def query(self, sparql_query):
+        self.calls += 1
+        return self.model.query(sparql_query)
+
+
+class ResultCacheTest(unittest.TestCase):
+    QUERY = PREFIXES + "SELECT ?label WHERE { :ElJefe rdfs:label ?label }"
+
+    def setUp(self):
+        self.model = _CountingModel(_small_model())
+        self.tool = create_query_jaguar_model_tool(self.model)
+
+    def test_repeated_query_is_served_from_the_cache(self):
+        first = self.tool(self.QUERY)
+        self.assertIn("El Jefe", first)
+        self.assertEqual(self.tool(self.QUERY), first)
+        self.assertEqual(self.model.calls, 1)
+
+    def test_cache_clear_runs_the_query_again(self):
+        self.tool(self.QUERY)
+        self.tool.cache_clear()
+        self.assertIn("El Jefe", self.tool(self.QUERY))
+        self.assertEqual(self.model.calls, 2)
+
+
+class EncoderParityTest(unittest.TestCase):
+    """The Python, Polars and C result encoders must write byte-identical SPARQL JSON."""
+
+    # Escapes, non-ASCII, URI/literal mixes and an all-null row, in the dtypes Polars encodes
+    NATIVE = pl.DataFrame({
+        "s": ["http://example.org/resource#ElJefe", 'a "q" \\ \n\t\r\b\f\x01\x1f\x7f', "\u2028 é 🐆", None, "https:/x"],
+        "uri": ["http://a/1", "https://b", None, None, "http://c"],
+        "é\"k": ["x", None, "", None, "y"],
+        "b": [True, False, None, None, True],
+        "i": [1, -2, 10**12, None, 0],
+        "u8": pl.Series([1, 2, 3, None, 255], dtype=pl.UInt8),
+    })
+    # Dtypes only the Python and C encoders handle
+    OTHER = pl.DataFrame({
+        "f": [1.5, None, 1e20, None, -0.0],
+        "d": [datetime.date(2020, 1, 1), None, None, None, datetime.date(1999, 12, 31)],
+        "dec": pl.Series([decimal.Decimal("1.50"), None, None, None, decimal.Decimal("-2")]),
+        "l": [[1], [2, 3], None, None, []],
+        "n": [None] * 5,
+    })
+
+    @staticmethod
+    def _python(df):
+        columns = df.get_columns()
+        encoders = [(column.name, jaguar_tool._encoder_for_column(column)) for column in columns]
+        return jaguar_tool._encode_bindings(df.columns, columns, encoders)
+
+    @staticmethod
+    def _c(df):
+        columns = df.get_columns()
+        kinds = [jaguar_tool._ENCODER_KINDS[jaguar_tool._encoder_for_column(column)] for column in columns]
+        return jaguar_tool._encode_result(df.columns, [column.to_list() for column in columns], kinds)
+
+    def _each_string_column_mode(self):
+        """Run with per-cell URI checks, then with columns classified up front."""
+        yield
+        with mock.patch.object(jaguar_tool, "CLASSIFY_MIN_ROWS", 0):
+            yield
+
+    def test_python_matches_polars(self):
+        for _ in self._each_string_column_mode():
+            self.assertEqual(self._python(self.NATIVE), jaguar_tool._encode_bindings_polars(self.NATIVE))
+
+    @unittest.skipIf(jaguar_tool._encode_result is None, "C encoder (_sparql_json) not built")
+    def test_c_matches_python(self):
+        for _ in self._each_string_column_mode():
+            for df in (self.NATIVE, self.OTHER, pl.concat([self.NATIVE, self.OTHER], how="horizontal")):
+                self.assertEqual(self._c(df), self._python(df))
+
+
+if __name__ == "__main__":
+    unittest.main()
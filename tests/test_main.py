@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import polars as pl
+
+import main
+
+FIXTURE_CSV = os.path.join(os.path.dirname(__file__), "fixtures", "jaguars.csv")
+
+RES = "http://example.org/resource#"
+ONT = "http://example.org/ontology#"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+XSD_BOOLEAN = "http://www.w3.org/2001/XMLSchema#boolean"
+
+
+def _iri(value):
+    return f"<{value}>"
+
+
+def _triple(subject, predicate, obj):
+    return f"{_iri(RES + subject)} {_iri(predicate)} {obj} ."
+
+
+def _labelled(name, cls):
+    """Type and label triples of a resource created from a list token."""
+    return {_triple(name, RDF_TYPE, _iri(ONT + cls)), _triple(name, RDFS + "label", f'"{name}"')}
+
+
+# Data triples the fixture maps to (the ontology's own triples are left out). Covers list
+# tokens with surrounding whitespace, a token repeated for one jaguar, empty tokens and
+# null list columns.
+EXPECTED_TRIPLES = {
+    _triple("Sombra", RDF_TYPE, _iri(ONT + "Jaguar")),
+    _triple("Sombra", RDFS + "label", '"Sombra"'),
+    _triple("Sombra", ONT + "scientificName", '"Panthera onca"'),
+    _triple("Sombra", ONT + "hasGender", '"Female"'),
+    _triple("Sombra", ONT + "hasMonitoringStartDate", '"2016-03-01"'),
+    _triple("Sombra", ONT + "wasKilled", f'"false"^^{_iri(XSD_BOOLEAN)}'),
+    _triple("Sombra", ONT + "hasIdentificationMark", '"Dark rosettes"'),
+    _triple("Sombra", RDFS + "comment", '"Seen twice"'),
+    _triple("Sombra", ONT + "hasDietType", _iri(RES + "CarnivoreDiet")),
+    _triple("Sombra", ONT + "occursIn", _iri(RES + "Sonora")),
+    _triple("Sombra", ONT + "occursIn", _iri(RES + "Arizona")),
+    _triple("Sombra", ONT + "monitoredByOrg", _iri(RES + "NorthernJaguarProject")),
+    _triple("Sombra", ONT + "facesThreat", _iri(RES + "HabitatLoss")),
+    _triple("Sombra", ONT + "monitoredByTechnique", _iri(RES + "CameraTrap")),
+    _triple("Yaguara", RDF_TYPE, _iri(ONT + "Jaguar")),
+    _triple("Yaguara", RDFS + "label", '"Yaguara"'),
+    _triple("Yaguara", ONT + "scientificName", '"Panthera onca"'),
+    _triple("Yaguara", ONT + "wasKilled", f'"true"^^{_iri(XSD_BOOLEAN)}'),
+    _triple("Yaguara", ONT + "causeOfDeath", '"Road collision"'),
+    _triple("Yaguara", ONT + "hasDietType", _iri(RES + "CarnivoreDiet")),
+    _triple("Yaguara", ONT + "occursIn", _iri(RES + "Chiapas")),
+    *_labelled("Sonora", "Location"),
+    *_labelled("Arizona", "Location"),
+    *_labelled("Chiapas", "Location"),
+    *_labelled("NorthernJaguarProject", "ConservationOrganization"),
+    *_labelled("HabitatLoss", "Threat"),
+    *_labelled("CameraTrap", "MonitoringTechnique"),
+}
+
+
+class BuildJaguarModelTest(unittest.TestCase):
+    def setUp(self):
+        # Work on a copy, since the pipeline writes its Parquet and frame caches next to the CSV
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.csv_path = shutil.copy(FIXTURE_CSV, self.tmp)
+        self.cache_dir = os.path.join(self.tmp, "frames")
+
+    def _data_triples(self, model):
+        path = os.path.join(self.tmp, "graph.nt")
+        model.write(path, format="ntriples")
+        with open(path, encoding="utf-8") as f:
+            graph = {line.strip() for line in f if line.strip()}
+        with open("data/jaguar_ontology.nt", encoding="utf-8") as f:
+            ontology = {line.strip() for line in f if line.strip()}
+        return graph - ontology
+
+    def test_maps_fixture_to_expected_triples(self):
+        model = main.build_jaguar_model(self.csv_path, self.cache_dir)
+        self.assertEqual(self._data_triples(model), EXPECTED_TRIPLES)
+
+    def test_cached_frames_give_the_same_graph(self):
+        main.build_jaguar_model(self.csv_path, self.cache_dir)
+        model = main.build_jaguar_model(self.csv_path, self.cache_dir)
+        self.assertEqual(self._data_triples(model), EXPECTED_TRIPLES)
+
+    def test_list_tokens_are_trimmed_and_deduplicated(self):
+        frames = main.initialize_jaguar_dfs(self.csv_path, self.cache_dir)
+        locations = frames[ONT + "JaguarLocation"].filter(id=RES + "Sombra")
+        self.assertEqual(sorted(locations["location"]), ["Arizona", "Sonora"])
+        self.assertEqual(frames[ONT + "JaguarThreat"]["threats"].to_list(), ["HabitatLoss"])
+
+
+class ReplaceAtomicallyTest(unittest.TestCase):
+    def test_failed_write_keeps_the_old_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "frame.arrow")
+            main._replace_atomically(path, pl.DataFrame({"a": [1]}).write_ipc)
+
+            def write_partially(tmp_path):
+                with open(tmp_path, "wb") as f:
+                    f.write(b"partial")
+                raise OSError("disk full")
+
+            with self.assertRaises(OSError):
+                main._replace_atomically(path, write_partially)
+            self.assertEqual(pl.read_ipc(path)["a"].to_list(), [1])
+            self.assertEqual(os.listdir(tmp), ["frame.arrow"])
+
+
+class IriTest(unittest.TestCase):
+    def test_distinct_values_give_distinct_iris(self):
+        values = [
+            "Cerrado, Brazil", "Cerrado  Brazil", "Cerrado_Brazil", "Cerrado%2C%20Brazil",
+            "Xamã", "Xamá", "Xam_", "a b", "a_b", "a%20b", "100%", "a/b", "a#b", "a<b>",
+        ]
+        iris = pl.select(main._iri(pl.Series(values)))[:, 0].to_list()
+        self.assertEqual(len(set(iris)), len(values))
+        self.assertEqual(iris[0], RES + "Cerrado%2C%20Brazil")
+        self.assertEqual(iris[4], RES + "Xamã")
+
+
+if __name__ == "__main__":
+    unittest.main()